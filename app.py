@@ -1,10 +1,13 @@
 import os
 import sys
+import io
+import hashlib
 from pathlib import Path
 import pandas as pd
 import numpy as np
 import streamlit as st
-import altair as alt
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype
+from packaging.version import Version
 
 # Allow importing from ./src
 ROOT = Path(__file__).resolve().parent
@@ -14,10 +17,18 @@ if str(SRC) not in sys.path:
 
 from analyze_network import compute_aggregations
 try:
-    from db_connection import get_connection, fetch_sample_usage
+    from db_connection import (get_connection, fetch_sample_usage,
+                               fetch_aggregations, fetch_usage_rollup)
 except Exception:
     get_connection = None
     fetch_sample_usage = None
+    fetch_aggregations = None
+    fetch_usage_rollup = None
+
+# Slices share memory with their parent until written to, so filtered views
+# need no defensive .copy() (always on from pandas 3, where the option is deprecated)
+if Version(pd.__version__) < Version("3"):
+    pd.set_option("mode.copy_on_write", True)
 
 st.set_page_config(page_title="Network Utilization Dashboard", layout="wide")
 st.title("📡 Network Utilization Dashboard for Infrastructure Planning")
@@ -28,6 +39,44 @@ REQUIRED_COLS = {
     "latency_ms","packet_loss_pct","users_active"
 }
 
+# Column types for the fast CSV path; numbers are coerced at read time.
+CSV_SCHEMA = {
+    "region": "string", "city": "string", "site_id": "string",
+    "cell_id": "string", "tech": "string",
+    "capacity_mbps": "float64", "throughput_mbps": "float64",
+    "utilization_pct": "float64", "latency_ms": "float64",
+    "packet_loss_pct": "float64", "users_active": "int32",
+}
+
+# Low-cardinality labels stored as categoricals (groupby/filter on int codes)
+CATEGORICAL_COLS = ("region", "city", "tech", "site_id", "cell_id")
+
+# Vega-Lite specs built once as plain dicts (no Altair object tree per rerun).
+# The interval param bound to scales gives the same pan/zoom as .interactive().
+_ZOOM = [{"name": "zoom", "select": "interval", "bind": "scales"}]
+
+UTIL_SPEC = {
+    "mark": "line",
+    "encoding": {
+        "x": {"field": "timestamp", "type": "temporal", "title": "Time"},
+        "y": {"field": "utilization_pct", "type": "quantitative", "title": "Utilization (%)"},
+        "color": {"field": "site_id", "type": "nominal", "title": "Site"},
+    },
+    "params": _ZOOM,
+    "height": 300,
+}
+
+HOD_SPEC = {
+    "mark": {"type": "line", "point": True},
+    "encoding": {
+        "x": {"field": "hour", "type": "ordinal", "title": "Hour"},
+        "y": {"field": "utilization_pct", "type": "quantitative", "title": "Avg Utilization (%)"},
+        "color": {"field": "tech", "type": "nominal"},
+    },
+    "params": _ZOOM,
+    "height": 280,
+}
+
 # --- Helpers ---
 def _apply_aliases(df: pd.DataFrame) -> pd.DataFrame:
     """Optional aliasing if upstream feeds use different names."""
@@ -42,9 +91,29 @@ def _apply_aliases(df: pd.DataFrame) -> pd.DataFrame:
                     break
     return df
 
-def read_network_csv(file_or_path, required_cols: set) -> pd.DataFrame:
+def _read_csv_fast(file_or_path) -> pd.DataFrame:
+    """Multithreaded pyarrow parse with CSV_SCHEMA; falls back to the C engine
+    when pyarrow is missing or the file doesn't fit the schema (bad numerics,
+    nulls in integer columns). Types are only requested for columns actually in
+    the header, so aliased/missing columns reach the normal validation."""
+    def rewind():
+        if hasattr(file_or_path, "seek"):
+            file_or_path.seek(0)
+
+    header = set(pd.read_csv(file_or_path, nrows=0).columns)
+    rewind()
+    dtype = {c: t for c, t in CSV_SCHEMA.items() if c in header}
+    parse_dates = ["timestamp"] if "timestamp" in header else None
+    try:
+        return pd.read_csv(file_or_path, engine="pyarrow", dtype=dtype,
+                           parse_dates=parse_dates)
+    except (ImportError, KeyError, ValueError, TypeError):
+        rewind()
+        return pd.read_csv(file_or_path)
+
+def _parse_network_csv(file_or_path, required_cols: set) -> pd.DataFrame:
     """Safer CSV loader: check headers, then parse timestamp, fail fast with clear errors."""
-    df = pd.read_csv(file_or_path)
+    df = _read_csv_fast(file_or_path)
     df = _apply_aliases(df)
     missing = required_cols - set(df.columns)
     if missing:
@@ -53,29 +122,127 @@ def read_network_csv(file_or_path, required_cols: set) -> pd.DataFrame:
             f"Missing: {sorted(list(missing))}\n"
             f"Expected at least: {sorted(list(required_cols))}"
         )
-    # Parse timestamp
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    # Parse timestamp (already done by the pyarrow path)
+    if not is_datetime64_any_dtype(df["timestamp"]):
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
     if df["timestamp"].isna().all():
         raise ValueError(
             "Could not parse any valid datetimes in 'timestamp'. "
             "Use ISO-like formats (e.g., 2025-08-22 19:05:00)."
         )
-    # Basic hygiene
+    df = df.dropna(subset=["timestamp"])
+    # Basic hygiene (only needed on the C-engine fallback)
     numeric_cols = [
         "capacity_mbps","throughput_mbps","utilization_pct",
         "latency_ms","packet_loss_pct","users_active"
     ]
     for c in numeric_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+        if not is_numeric_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
     # Optional: compute utilization if missing/NaN
     if "utilization_pct" in df.columns:
         need_util = df["utilization_pct"].isna()
         if need_util.any():
             with np.errstate(divide="ignore", invalid="ignore"):
                 calc = (df["throughput_mbps"] / df["capacity_mbps"]) * 100.0
-                df.loc[need_util, "utilization_pct"] = calc.clip(lower=0, upper=100)
+                df.loc[need_util, "utilization_pct"] = (
+                    calc.clip(lower=0, upper=100).astype(df["utilization_pct"].dtype)
+                )
+    for c in CATEGORICAL_COLS:
+        df[c] = df[c].astype("category")
+    # Sorted once so date filtering can slice with searchsorted
+    df = df.sort_values("timestamp", kind="mergesort").reset_index(drop=True)
+    return df
+
+# Bump whenever _parse_network_csv changes its output (dtypes, order, columns) so
+# sidecars written by older loaders are ignored rather than served.
+SIDECAR_VERSION = 1
+
+def _sidecar_path(path_str: str) -> Path:
+    path = Path(path_str)
+    return path.with_name(f"{path.stem}.v{SIDECAR_VERSION}.parquet")
+
+def _sidecar_ok(df: pd.DataFrame, required_cols: set) -> bool:
+    """Does a Parquet sidecar look like _parse_network_csv output?"""
+    if not required_cols <= set(df.columns):
+        return False
+    if not all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in CATEGORICAL_COLS):
+        return False
+    ts = df["timestamp"]
+    return is_datetime64_any_dtype(ts) and ts.is_monotonic_increasing
+
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def _load_csv_cached(path_str: str, mtime: float, required_cols: frozenset) -> pd.DataFrame:
+    """Parsed CSV keyed on path + mtime, so reruns skip the parse until the file changes.
+
+    A versioned Parquet sidecar is written next to the CSV after the first
+    successful parse and read instead of the CSV on later cold starts, as long
+    as it is still fresh and has the shape the loader produces.
+    """
+    pq_path = _sidecar_path(path_str)
+    try:
+        if pq_path.exists() and pq_path.stat().st_mtime >= mtime:
+            df = pd.read_parquet(pq_path, engine="pyarrow")
+            if _sidecar_ok(df, set(required_cols)):
+                return df
+    except Exception:
+        pass  # unreadable sidecar: fall back to the CSV
+    df = _parse_network_csv(path_str, set(required_cols))
+    try:
+        df.to_parquet(pq_path, compression="snappy", index=False)
+    except Exception:
+        pass  # read-only dir or no pyarrow: the CSV path still works
     return df
 
+@st.cache_data(ttl=3600, max_entries=4, show_spinner=False)
+def _load_upload_cached(digest: str, _data: bytes, required_cols: frozenset) -> pd.DataFrame:
+    """Parsed upload keyed on a content hash (the raw bytes are not hashed again)."""
+    return _parse_network_csv(io.BytesIO(_data), set(required_cols))
+
+def read_network_csv(file_or_path, required_cols: set):
+    """Cached wrapper around _parse_network_csv for local paths and Streamlit uploads.
+
+    Returns (df, source_key): the key (path@mtime, or sha1 of the uploaded bytes)
+    identifies the data for downstream caches without hashing the upload again.
+    """
+    if isinstance(file_or_path, (str, os.PathLike)):
+        path_str = os.fspath(file_or_path)
+        mtime = os.path.getmtime(path_str)
+        df = _load_csv_cached(path_str, mtime, frozenset(required_cols))
+        return df, f"{path_str}@{mtime}"
+    data = file_or_path.getvalue()
+    digest = hashlib.sha1(data).hexdigest()
+    return _load_upload_cached(digest, data, frozenset(required_cols)), digest
+
+def _cat_mask(series: pd.Series, selected) -> np.ndarray:
+    """Boolean mask for a categorical column, comparing int codes instead of strings."""
+    codes = series.cat.categories.get_indexer(selected)
+    codes = codes[codes >= 0]  # unknown labels; -1 is also the NaN code
+    return np.isin(series.cat.codes.to_numpy(), codes)
+
+def _frame_fingerprint(df: pd.DataFrame):
+    """Fast stand-in for hashing a whole DataFrame in st.cache_data."""
+    if df.empty:
+        return (0, tuple(df.columns))
+    return (len(df), df["timestamp"].iloc[0], df["timestamp"].iloc[-1], tuple(df.columns))
+
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False,
+               hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _cached_aggregations(df_f: pd.DataFrame, filters_key: tuple):
+    """compute_aggregations keyed on the filtered frame fingerprint + active filters."""
+    return compute_aggregations(df_f)
+
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def _to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV download payload, cached per table content so reruns don't
+    re-serialize every tab (analysis tables are small to hash)."""
+    return df.to_csv(index=False).encode('utf-8')
+
+@st.cache_resource(show_spinner=False)
+def _shared_engine():
+    """One pooled SQLAlchemy engine for every session and rerun."""
+    return get_connection()
+
 # --- Data Source Choice ---
 with st.sidebar:
     st.header("Data Source")
@@ -84,12 +251,14 @@ with st.sidebar:
     default_csv = ROOT / "data" / "network_usage_sample.csv"
     uploaded = None
     df = None
+    data_key = None
+    engine = None
 
     if source == "CSV (local/upload)":
         uploaded = st.file_uploader("Upload CSV (optional)", type=["csv"])
         if uploaded is not None:
             try:
-                df = read_network_csv(uploaded, REQUIRED_COLS)
+                df, data_key = read_network_csv(uploaded, REQUIRED_COLS)
             except Exception as e:
                 st.error(str(e))
                 st.stop()
@@ -97,7 +266,7 @@ with st.sidebar:
             if default_csv.exists():
                 st.caption(f"Using default CSV: {default_csv}")
                 try:
-                    df = read_network_csv(default_csv, REQUIRED_COLS)
+                    df, data_key = read_network_csv(default_csv, REQUIRED_COLS)
                 except Exception as e:
                     st.error(str(e))
                     st.stop()
@@ -117,7 +286,7 @@ with st.sidebar:
                 st.error("Database utilities not available.")
             else:
                 try:
-                    engine = get_connection()
+                    engine = _shared_engine()
                     df = fetch_sample_usage(engine)
                     # Validate/normalize DB output as well
                     df = _apply_aliases(df)
@@ -125,7 +294,13 @@ with st.sidebar:
                     if missing:
                         st.error(f"DB result missing columns: {sorted(list(missing))}")
                         st.stop()
-                    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+                    if not is_datetime64_any_dtype(df["timestamp"]):
+                        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+                    df = df.dropna(subset=["timestamp"])
+                    for c in CATEGORICAL_COLS:
+                        df[c] = df[c].astype("category")
+                    df = df.sort_values("timestamp", kind="mergesort").reset_index(drop=True)
+                    data_key = "db"
                     st.success(f"Fetched {len(df):,} rows from DB.")
                 except Exception as e:
                     st.exception(e)
@@ -133,9 +308,11 @@ with st.sidebar:
 if df is None or df.empty:
     st.stop()
 
-# Ensure timestamp is datetime and drop invalid
-df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-df = df.dropna(subset=["timestamp"])
+# Ensure timestamp is datetime and drop invalid (loaders normally did this already)
+if not is_datetime64_any_dtype(df["timestamp"]):
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df = df.dropna(subset=["timestamp"])
+    df = df.sort_values("timestamp", kind="mergesort").reset_index(drop=True)
 
 # --- Required columns check ---
 missing = REQUIRED_COLS - set(df.columns)
@@ -157,28 +334,42 @@ with st.sidebar:
         max_value=max_d
     )
 
-    techs = st.multiselect("Tech", sorted(df["tech"].dropna().unique()), default=None)
-    regions = st.multiselect("Region", sorted(df["region"].dropna().unique()), default=None)
-    cities = st.multiselect("City", sorted(df["city"].dropna().unique()), default=None)
-    sites = st.multiselect("Site", sorted(df["site_id"].dropna().unique()), default=None)
+    # Categories are already the sorted distinct labels; no scan of the rows needed
+    choices = {c: df[c].cat.categories.tolist() for c in ("tech", "region", "city", "site_id")}
+    techs = st.multiselect("Tech", choices["tech"], default=None)
+    regions = st.multiselect("Region", choices["region"], default=None)
+    cities = st.multiselect("City", choices["city"], default=None)
+    sites = st.multiselect("Site", choices["site_id"], default=None)
     util_threshold = st.slider("Congestion threshold (%)", 50, 100, 80)
+    bucket_min = st.slider("Chart bucket (min)", 1, 60, 5,
+                           help="Larger buckets plot fewer points and redraw faster.")
 
 # Convert date range to pandas.Timestamp for comparison
 start_date = pd.to_datetime(date_range[0])
 end_date = pd.to_datetime(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
-# Apply filters
-mask = (df["timestamp"] >= start_date) & (df["timestamp"] <= end_date)
-if techs:   mask &= df["tech"].isin(techs)
-if regions: mask &= df["region"].isin(regions)
-if cities:  mask &= df["city"].isin(cities)
-if sites:   mask &= df["site_id"].isin(sites)
+# Apply filters: df is sorted by timestamp, so the date range is a slice
+ts = df["timestamp"].to_numpy()
+bounds = np.array([start_date.to_datetime64(), end_date.to_datetime64()]).astype(ts.dtype)
+lo = np.searchsorted(ts, bounds[0], side="left")
+hi = np.searchsorted(ts, bounds[1], side="right")
+window = df.iloc[lo:hi]
 
-df_f = df.loc[mask].copy()
+mask = np.ones(len(window), dtype=bool)
+if techs:   mask &= _cat_mask(window["tech"], techs)
+if regions: mask &= _cat_mask(window["region"], regions)
+if cities:  mask &= _cat_mask(window["city"], cities)
+if sites:   mask &= _cat_mask(window["site_id"], sites)
+
+df_f = window.loc[mask]
 if df_f.empty:
     st.warning("No data after applying filters.")
     st.stop()
 
+# Derived time keys, computed once and shared by charts, congestion and aggregations
+ts_f = df_f["timestamp"].dt
+df_f = df_f.assign(hour=ts_f.hour.astype("int8"), date=ts_f.floor("D"))
+
 # --- KPIs (robust) ---
 def safe_metric(val, fmt="{:.1f}"):
     try:
@@ -191,7 +382,7 @@ def safe_metric(val, fmt="{:.1f}"):
 kpi_cols = st.columns(5)
 kpi_cols[0].metric("Rows", f"{len(df_f):,}")
 kpi_cols[1].metric("Avg Utilization (P95 proxy)",
-                   safe_metric(np.percentile(df_f["utilization_pct"].dropna(), 95), "{:.1f}%"))
+                   safe_metric(np.nanpercentile(df_f["utilization_pct"].to_numpy(copy=False), 95), "{:.1f}%"))
 kpi_cols[2].metric("Peak Utilization",
                    safe_metric(df_f["utilization_pct"].max(), "{:.1f}%"))
 kpi_cols[3].metric("Avg Latency (ms)",
@@ -201,49 +392,65 @@ kpi_cols[4].metric("Active Users (avg)",
 
 # --- Charts ---
 st.subheader("Utilization Over Time")
-util_chart = alt.Chart(df_f).mark_line().encode(
-    x=alt.X('timestamp:T', title='Time'),
-    y=alt.Y('utilization_pct:Q', title='Utilization (%)'),
-    color=alt.Color('site_id:N', title='Site')
-).properties(height=300)
-st.altair_chart(util_chart.interactive(), use_container_width=True)
+# Plot per-site means over fixed time buckets rather than every raw sample
+chart_df = None
+if engine is not None and fetch_usage_rollup is not None:
+    try:
+        chart_df = fetch_usage_rollup(engine, start_date, end_date,
+                                      techs, regions, cities, sites, bucket_minutes=bucket_min)
+    except Exception as e:
+        st.warning(f"DB rollup failed, charting fetched rows instead: {e}")
+if chart_df is None:
+    chart_df = (df_f.groupby(["site_id", pd.Grouper(key="timestamp", freq=f"{bucket_min}min")],
+                             observed=True, as_index=False)["utilization_pct"]
+                    .mean())
+st.vega_lite_chart(chart_df, UTIL_SPEC, use_container_width=True)
 
 st.subheader("Hour-of-Day vs Avg Utilization (by Tech)")
-df_f["hour"] = df_f["timestamp"].dt.hour
-hod = df_f.groupby(["hour","tech"], as_index=False)["utilization_pct"].mean()
-hod_chart = alt.Chart(hod).mark_line(point=True).encode(
-    x=alt.X('hour:O', title='Hour'),
-    y=alt.Y('utilization_pct:Q', title='Avg Utilization (%)'),
-    color='tech:N'
-).properties(height=280)
-st.altair_chart(hod_chart.interactive(), use_container_width=True)
+hod = df_f.groupby(["hour","tech"], as_index=False, observed=True)["utilization_pct"].mean()
+st.vega_lite_chart(hod, HOD_SPEC, use_container_width=True)
 
 st.subheader(f"Prime-Time Congestion (19:00–23:00, threshold {util_threshold}%)")
 prime = df_f[(df_f["hour"]>=19) & (df_f["hour"]<=23)]
-congested = prime[prime["utilization_pct"] >= util_threshold].copy()
+congested = prime[prime["utilization_pct"] >= util_threshold]
 congested_view = congested[["timestamp","region","city","site_id","cell_id","tech","utilization_pct","latency_ms"]]\
     .sort_values(["utilization_pct","latency_ms"], ascending=[False, False])
 st.dataframe(congested_view, use_container_width=True, hide_index=True)
 
 # --- Analysis tables + downloads ---
 st.subheader("Analysis Tables")
-tables = compute_aggregations(df_f)
+filters_key = (data_key, str(start_date), str(end_date),
+               tuple(techs), tuple(regions), tuple(cities), tuple(sites))
+tables = None
+if engine is not None and fetch_aggregations is not None:
+    # DB source: aggregate next to the data instead of over the fetched sample
+    try:
+        tables = fetch_aggregations(engine, start_date, end_date,
+                                    techs, regions, cities, sites)
+    except Exception as e:
+        st.warning(f"DB aggregation failed, using fetched rows instead: {e}")
+if tables is None:
+    tables = _cached_aggregations(df_f, filters_key)
 
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["site_hour","site_day","busy_hour","congested_cells","hour_of_day"])
 with tab1:
     st.dataframe(tables["site_hour"].head(100), use_container_width=True, hide_index=True)
-    st.download_button("Download site_hour.csv", tables["site_hour"].to_csv(index=False).encode('utf-8'), "site_hour.csv", "text/csv")
+    st.download_button("Download site_hour.csv", _to_csv_bytes(tables["site_hour"]), "site_hour.csv", "text/csv")
 with tab2:
-    st.dataframe(tables["site_day"].head(100), use_container_width=True, hide_index=True)
-    st.download_button("Download site_day.csv", tables["site_day"].to_csv(index=False).encode('utf-8'), "site_day.csv", "text/csv")
+    # Only the displayed rows are formatted; the table itself keeps datetime64 days
+    site_day_view = tables["site_day"].head(100)
+    site_day_view = site_day_view.assign(
+        date=pd.to_datetime(site_day_view["date"]).dt.strftime("%Y-%m-%d"))
+    st.dataframe(site_day_view, use_container_width=True, hide_index=True)
+    st.download_button("Download site_day.csv", _to_csv_bytes(tables["site_day"]), "site_day.csv", "text/csv")
 with tab3:
     st.dataframe(tables["busy_hour"].head(100), use_container_width=True, hide_index=True)
-    st.download_button("Download busy_hour.csv", tables["busy_hour"].to_csv(index=False).encode('utf-8'), "busy_hour.csv", "text/csv")
+    st.download_button("Download busy_hour.csv", _to_csv_bytes(tables["busy_hour"]), "busy_hour.csv", "text/csv")
 with tab4:
     st.dataframe(tables["congested_cells"].head(100), use_container_width=True, hide_index=True)
-    st.download_button("Download congested_cells.csv", tables["congested_cells"].to_csv(index=False).encode('utf-8'), "congested_cells.csv", "text/csv")
+    st.download_button("Download congested_cells.csv", _to_csv_bytes(tables["congested_cells"]), "congested_cells.csv", "text/csv")
 with tab5:
     st.dataframe(tables["hour_of_day"].head(100), use_container_width=True, hide_index=True)
-    st.download_button("Download hour_of_day.csv", tables["hour_of_day"].to_csv(index=False).encode('utf-8'), "hour_of_day.csv", "text/csv")
+    st.download_button("Download hour_of_day.csv", _to_csv_bytes(tables["hour_of_day"]), "hour_of_day.csv", "text/csv")
 
 st.caption("Tip: Use the sidebar filters to focus on a region/site or to move the congestion threshold.")
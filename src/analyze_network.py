@@ -1,43 +1,58 @@
-import numpy as np
 import pandas as pd
+import polars as pl
+
+LABEL_COLS = ["region", "city", "site_id", "cell_id", "tech"]
+USED_COLS = ["timestamp", *LABEL_COLS, "utilization_pct", "latency_ms", "users_active"]
 
 def compute_aggregations(df: pd.DataFrame):
-    df = df.copy()
-    df["date"] = df["timestamp"].dt.date
+    # pandas in, pandas out; the groupbys run in Polars. Labels cross over as
+    # plain strings so output order is lexical whatever the category order.
+    # Callers may pass hour/date precomputed; only derive what's missing.
+    cols = USED_COLS + [c for c in ("hour", "date") if c in df.columns]
+    lf = (pl.from_pandas(df[cols])
+            .lazy()
+            .with_columns(pl.col(LABEL_COLS).cast(pl.Utf8)))
     if "hour" not in df.columns:
-        df["hour"] = df["timestamp"].dt.hour
-
-    site_hour = df.groupby(["site_id","hour"], as_index=False).agg(
-        avg_util=("utilization_pct","mean"),
-        p95_util=("utilization_pct", lambda s: np.percentile(s.dropna(), 95) if s.notna().any() else np.nan),
-        avg_latency=("latency_ms","mean"),
-        users=("users_active","mean")
-    )
-
-    site_day = df.groupby(["site_id","date"], as_index=False).agg(
-        avg_util=("utilization_pct","mean"),
-        peak_util=("utilization_pct","max"),
-        avg_latency=("latency_ms","mean"),
-        users=("users_active","mean")
-    )
-
-    # Busy hour per site: hour with max average utilization
-    tmp = (df.groupby(["site_id","hour"], as_index=False)["utilization_pct"]
-             .mean()
-             .rename(columns={"utilization_pct":"hour_avg_util"}))
-    busy_hour = (tmp.sort_values(["site_id","hour_avg_util"], ascending=[True, False])
-                    .groupby("site_id", as_index=False).head(1))
-
-    congested_cells = (df[df["utilization_pct"] >= 80]
-                       .sort_values(["utilization_pct","latency_ms"], ascending=[False, False])
-                       .loc[:, ["timestamp","region","city","site_id","cell_id","tech","utilization_pct","latency_ms"]])
-
-    hour_of_day = df.groupby(["hour","tech"], as_index=False)["utilization_pct"].mean()
-
-    return {
-        "site_hour": site_hour,
-        "site_day": site_day,
-        "busy_hour": busy_hour,
-        "congested_cells": congested_cells,
-        "hour_of_day": hour_of_day,
-    }
+        lf = lf.with_columns(pl.col("timestamp").dt.hour().alias("hour"))
+    if "date" not in df.columns:
+        lf = lf.with_columns(pl.col("timestamp").dt.truncate("1d").alias("date"))
+
+    util = pl.col("utilization_pct")
+
+    site_hour = (lf.group_by(["site_id","hour"])
+                   .agg(util.mean().alias("avg_util"),
+                        util.quantile(0.95, interpolation="linear").alias("p95_util"),
+                        pl.col("latency_ms").mean().alias("avg_latency"),
+                        pl.col("users_active").mean().alias("users"))
+                   .sort(["site_id","hour"]))
+
+    site_day = (lf.group_by(["site_id","date"])
+                  .agg(util.mean().alias("avg_util"),
+                       util.max().alias("peak_util"),
+                       pl.col("latency_ms").mean().alias("avg_latency"),
+                       pl.col("users_active").mean().alias("users"))
+                  .sort(["site_id","date"]))
+
+    # Busy hour per site: hour with max average utilization (all-null sites still get one).
+    # A per-group reduction, so the result doesn't depend on row order surviving
+    # the optimizer (a sort followed by unique() does not on polars 1.x).
+    busy_hour = (site_hour.group_by("site_id")
+                          .agg(pl.col("hour").sort_by("avg_util", descending=True, nulls_last=True).first(),
+                               pl.col("avg_util").max().alias("hour_avg_util"))
+                          .sort("site_id"))
+
+    # Top 100 only (what the UI shows); sort + head is planned as a top-k
+    congested_cells = (lf.filter(util >= 80)
+                         .select("timestamp","region","city","site_id","cell_id","tech",
+                                 "utilization_pct","latency_ms")
+                         .sort(["utilization_pct","latency_ms"], descending=True, nulls_last=True)
+                         .head(100))
+
+    hour_of_day = (lf.group_by(["hour","tech"])
+                     .agg(util.mean())
+                     .sort(["hour","tech"]))
+
+    # One collect so the shared scan/derived columns are computed once
+    frames = pl.collect_all([site_hour, site_day, busy_hour, congested_cells, hour_of_day])
+    names = ["site_hour", "site_day", "busy_hour", "congested_cells", "hour_of_day"]
+    return {name: frame.to_pandas() for name, frame in zip(names, frames)}
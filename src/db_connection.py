@@ -1,6 +1,7 @@
 import os
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, bindparam
+from sqlalchemy.pool import QueuePool
 
 def _dsn_from_env() -> str:
     dialect = os.getenv("DB_DIALECT", "postgresql")
@@ -17,8 +18,17 @@ def _dsn_from_env() -> str:
         raise ValueError(f"Unsupported DB_DIALECT: {dialect}")
 
 def get_connection():
+    # Meant to be created once and shared (the app caches it with st.cache_resource),
+    # so connections are checked out of this pool instead of reopened per query.
     dsn = _dsn_from_env()
-    engine = create_engine(dsn, pool_pre_ping=True)
+    engine = create_engine(
+        dsn,
+        poolclass=QueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
     return engine
 
 def fetch_sample_usage(engine):
@@ -44,6 +54,120 @@ def fetch_sample_usage(engine):
         ORDER BY timestamp DESC
         LIMIT 200000
     """)
+    # Server-side cursor (psycopg2 named cursor / MySQL SSCursor) so rows stream
+    # in batches instead of landing in client memory all at once.
+    with engine.connect().execution_options(stream_results=True, yield_per=50_000) as conn:
+        chunks = list(pd.read_sql(q, conn, chunksize=50_000))
+    df = pd.concat(chunks, ignore_index=True)
+    return df
+
+def _filtered_usage_cte(start, end, techs=None, regions=None, cities=None, sites=None):
+    """CTE selecting the filtered rows, plus its bind params for text()."""
+    clauses = ["timestamp BETWEEN :start AND :end"]
+    params = {"start": start, "end": end}
+    binds = []
+    for col, vals in (("tech", techs), ("region", regions), ("city", cities), ("site_id", sites)):
+        if vals:
+            clauses.append(f"{col} IN :{col}")
+            params[col] = [str(v) for v in vals]
+            binds.append(bindparam(col, expanding=True))
+    cte = f"""
+        WITH filtered AS (
+            SELECT
+                timestamp, region, city, site_id, cell_id, tech,
+                CASE
+                    WHEN capacity_mbps > 0 THEN throughput_mbps * 100.0 / capacity_mbps
+                    ELSE NULL
+                END AS utilization_pct,
+                latency_ms,
+                users_active
+            FROM network_usage
+            WHERE {" AND ".join(clauses)}
+        )
+    """
+    return cte, params, binds
+
+def _run(conn, sql, params, binds):
+    return pd.read_sql(text(sql).bindparams(*binds), conn, params=params)
+
+def fetch_aggregations(engine, start, end, techs=None, regions=None, cities=None, sites=None,
+                       congested_limit=100):
+    """Same tables as analyze_network.compute_aggregations, computed in the database."""
+    cte, params, binds = _filtered_usage_cte(start, end, techs, regions, cities, sites)
+    # MySQL has no ordered-set aggregates; P95 is left empty there.
+    if engine.dialect.name == "postgresql":
+        p95 = "PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY utilization_pct)"
+    else:
+        p95 = "NULL"
+    with engine.connect() as conn:
+        site_hour = _run(conn, cte + f"""
+            SELECT site_id, EXTRACT(HOUR FROM timestamp) AS hour,
+                   AVG(utilization_pct) AS avg_util,
+                   {p95} AS p95_util,
+                   AVG(latency_ms) AS avg_latency,
+                   AVG(users_active) AS users
+            FROM filtered
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """, params, binds)
+        site_day = _run(conn, cte + """
+            SELECT site_id, CAST(timestamp AS DATE) AS date,
+                   AVG(utilization_pct) AS avg_util,
+                   MAX(utilization_pct) AS peak_util,
+                   AVG(latency_ms) AS avg_latency,
+                   AVG(users_active) AS users
+            FROM filtered
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """, params, binds)
+        congested_cells = _run(conn, cte + """
+            SELECT timestamp, region, city, site_id, cell_id, tech, utilization_pct, latency_ms
+            FROM filtered
+            WHERE utilization_pct >= 80
+            ORDER BY utilization_pct DESC, latency_ms DESC
+            LIMIT :limit
+        """, {**params, "limit": int(congested_limit)}, binds)
+        hour_of_day = _run(conn, cte + """
+            SELECT EXTRACT(HOUR FROM timestamp) AS hour, tech,
+                   AVG(utilization_pct) AS utilization_pct
+            FROM filtered
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+        """, params, binds)
+
+    # Busy hour per site falls out of site_hour (already one row per site/hour)
+    for t in (site_hour, hour_of_day):
+        t["hour"] = t["hour"].astype(int)
+    tmp = site_hour[["site_id","hour","avg_util"]].rename(columns={"avg_util":"hour_avg_util"})
+    # Single-key sort, then keep each site's highest row (all-NaN sites still get one)
+    busy_hour = (tmp.sort_values("hour_avg_util", ascending=False, kind="stable")
+                    .drop_duplicates("site_id")
+                    .sort_values("site_id")
+                    .reset_index(drop=True))
+
+    return {
+        "site_hour": site_hour,
+        "site_day": site_day,
+        "busy_hour": busy_hour,
+        "congested_cells": congested_cells,
+        "hour_of_day": hour_of_day,
+    }
+
+def fetch_usage_rollup(engine, start, end, techs=None, regions=None, cities=None, sites=None,
+                       bucket_minutes=5):
+    """Mean utilization per site in fixed time buckets, for the time-series chart."""
+    cte, params, binds = _filtered_usage_cte(start, end, techs, regions, cities, sites)
+    if engine.dialect.name == "postgresql":
+        bucket = ("TO_TIMESTAMP(FLOOR(EXTRACT(EPOCH FROM timestamp) / (:bucket * 60)) * (:bucket * 60))"
+                  " AT TIME ZONE 'UTC'")
+    else:
+        bucket = "FROM_UNIXTIME(FLOOR(UNIX_TIMESTAMP(timestamp) / (:bucket * 60)) * (:bucket * 60))"
     with engine.connect() as conn:
-        df = pd.read_sql(q, conn)
+        df = _run(conn, cte + f"""
+            SELECT site_id, {bucket} AS timestamp, AVG(utilization_pct) AS utilization_pct
+            FROM filtered
+            GROUP BY 1, 2
+            ORDER BY 2
+        """, {**params, "bucket": int(bucket_minutes)}, binds)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
     return df
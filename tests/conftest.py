@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Same import path the app sets up, so tests import `analyze_network` directly
+SRC = Path(__file__).resolve().parent.parent / "src"
+if str(SRC) not in sys.path:
+    sys.path.append(str(SRC))
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from analyze_network import LABEL_COLS, compute_aggregations
+
+CSV = Path(__file__).resolve().parent.parent / "network_utilization_full.csv"
+
+
+def _load():
+    df = pd.read_csv(CSV, parse_dates=["timestamp"])
+    for c in LABEL_COLS:
+        df[c] = df[c].astype("category")
+    return df.sort_values("timestamp", kind="mergesort").reset_index(drop=True)
+
+
+def _pandas_reference(df):
+    """The pandas implementation compute_aggregations replaced."""
+    df = df.assign(date=df["timestamp"].dt.floor("D"), hour=df["timestamp"].dt.hour)
+    g = dict(as_index=False, observed=True)
+
+    site_hour = df.groupby(["site_id","hour"], **g).agg(
+        avg_util=("utilization_pct","mean"),
+        p95_util=("utilization_pct", lambda s: s.quantile(0.95)),
+        avg_latency=("latency_ms","mean"),
+        users=("users_active","mean"),
+    )
+    site_day = df.groupby(["site_id","date"], **g).agg(
+        avg_util=("utilization_pct","mean"),
+        peak_util=("utilization_pct","max"),
+        avg_latency=("latency_ms","mean"),
+        users=("users_active","mean"),
+    )
+    tmp = (df.groupby(["site_id","hour"], **g)["utilization_pct"].mean()
+             .rename(columns={"utilization_pct":"hour_avg_util"}))
+    busy_hour = (tmp.sort_values(["site_id","hour_avg_util"], ascending=[True, False])
+                    .groupby("site_id", **g).head(1))
+    congested_cells = (df[df["utilization_pct"] >= 80]
+                       .sort_values(["utilization_pct","latency_ms"], ascending=[False, False])
+                       .loc[:, ["timestamp","region","city","site_id","cell_id","tech",
+                                "utilization_pct","latency_ms"]]
+                       .head(100))
+    hour_of_day = df.groupby(["hour","tech"], **g)["utilization_pct"].mean()
+    return {
+        "site_hour": site_hour,
+        "site_day": site_day,
+        "busy_hour": busy_hour,
+        "congested_cells": congested_cells,
+        "hour_of_day": hour_of_day,
+    }
+
+
+def _normalize(t):
+    t = t.reset_index(drop=True)
+    for c in t.columns:
+        if c in LABEL_COLS:
+            t[c] = t[c].astype(str)
+        elif c == "hour":
+            t[c] = t[c].astype("int64")
+        elif c in ("timestamp", "date"):
+            t[c] = pd.to_datetime(t[c]).astype("datetime64[ns]")
+    return t
+
+
+@pytest.mark.parametrize("precomputed", [False, True])
+def test_compute_aggregations_matches_pandas(precomputed):
+    df = _load()
+    if precomputed:
+        # Same derived columns the app adds before calling compute_aggregations
+        df = df.assign(hour=df["timestamp"].dt.hour.astype("int8"),
+                       date=df["timestamp"].dt.floor("D"))
+    got = compute_aggregations(df)
+    expected = _pandas_reference(_load())
+    assert got.keys() == expected.keys()
+    for name in expected:
+        pdt.assert_frame_equal(_normalize(got[name]), _normalize(expected[name]),
+                               check_dtype=False, obj=name)
+
+
+def test_busy_hour_is_each_sites_max_hour():
+    busy = compute_aggregations(_load())["busy_hour"].set_index("site_id")
+    assert busy.loc["SITE_1", "hour"] == 20
+    assert busy.loc["SITE_1", "hour_avg_util"] == pytest.approx(81.705)
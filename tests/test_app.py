@@ -0,0 +1,53 @@
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+CSV = ROOT / "network_utilization_full.csv"
+
+
+@pytest.fixture
+def app_dir(tmp_path):
+    shutil.copy(ROOT / "app.py", tmp_path / "app.py")
+    shutil.copytree(ROOT / "src", tmp_path / "src")
+    (tmp_path / "data").mkdir()
+    shutil.copy(CSV, tmp_path / "data" / "network_usage_sample.csv")
+    return tmp_path
+
+
+def _write_foreign_sidecar(path: Path, csv: Path):
+    # Plain read_csv output: object labels, unsorted, not what the loader writes
+    pd.read_csv(csv).iloc[::-1].to_parquet(path, index=False)
+    newer = os.path.getmtime(csv) + 60
+    os.utime(path, (newer, newer))
+
+
+def _run(app_dir):
+    at = AppTest.from_file(str(app_dir / "app.py"), default_timeout=60).run()
+    assert not at.exception
+    assert at.metric[0].value == "200"
+    return at
+
+
+@pytest.mark.parametrize("name", ["network_usage_sample.v1.parquet",
+                                  "network_usage_sample.parquet"])
+def test_foreign_or_stale_sidecar_falls_back_to_csv(app_dir, name):
+    data = app_dir / "data"
+    _write_foreign_sidecar(data / name, data / "network_usage_sample.csv")
+    _run(app_dir)
+
+    sidecar = pd.read_parquet(data / "network_usage_sample.v1.parquet")
+    assert isinstance(sidecar["site_id"].dtype, pd.CategoricalDtype)
+    assert sidecar["timestamp"].is_monotonic_increasing
+
+
+def test_sidecar_is_reused(app_dir):
+    _run(app_dir)
+    assert (app_dir / "data" / "network_usage_sample.v1.parquet").exists()
+    _run(app_dir)